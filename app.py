@@ -1,80 +1,323 @@
 import streamlit as st
-import json
+import orjson
 import os
+import hashlib
 import datetime
 import pandas as pd
 import uuid
+import ahocorasick
+from collections import defaultdict
+import numpy as np
+from numba import njit, prange
+
+# Optional: SIMD multi-pattern matcher for batch re-scoring. The
+# automaton path is used when it is not installed.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 # Load / Save Helpers
+#
+# Storage is an append-only JSONL log: one full grievance record per
+# line, plus {"op": "update", ...} delta lines for status changes. A
+# mutation appends a single line instead of rewriting the whole store,
+# and the log is compacted back to one line per grievance once enough
+# update deltas accumulate.
+GRIEVANCE_FILE = "grievances.jsonl"
+LEGACY_FILE = "grievances.json"
+COMPACT_AFTER = 100  # replayed updates that trigger a compaction
+
 def load_grievances():
-    if os.path.exists("grievances.json"):
-        with open("grievances.json", "r") as f:
-            return json.load(f)
-    return []
+    if not os.path.exists(GRIEVANCE_FILE):
+        # Migrate the old single-array JSON store if present
+        if os.path.exists(LEGACY_FILE):
+            with open(LEGACY_FILE, "rb") as f:
+                grievances = orjson.loads(f.read())
+            compact_grievances(grievances)
+            return grievances
+        return []
+
+    grievances = []
+    index = {}
+    updates = 0
+    with open(GRIEVANCE_FILE, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = orjson.loads(line)
+            if record.get("op") == "update":
+                # Tolerate deltas whose record is gone (e.g. a concurrent
+                # session compacted the log from a stale list) — an
+                # orphan update must not make the store unreadable
+                pos = index.get(record["ID"])
+                if pos is None:
+                    continue
+                g = grievances[pos]
+                for field in ("Status", "Escalated"):
+                    if field in record:
+                        g[field] = record[field]
+                updates += 1
+            else:
+                index[record["ID"]] = len(grievances)
+                grievances.append(record)
+
+    if updates > COMPACT_AFTER:
+        compact_grievances(grievances)
+    return grievances
+
+@st.cache_data
+def _load_cached(path, mtime):
+    # mtime is part of the cache key: unchanged files are served from
+    # memory across reruns, any write invalidates via the new mtime.
+    return load_grievances()
+
+def _store_mtime():
+    return os.path.getmtime(GRIEVANCE_FILE) if os.path.exists(GRIEVANCE_FILE) else 0.0
+
+@st.cache_data
+def _id_index(mtime):
+    # ID -> list position, so status updates are a hash lookup instead
+    # of a linear scan over the whole store
+    return {g["ID"]: i for i, g in enumerate(_load_cached(GRIEVANCE_FILE, mtime))}
+
+@st.cache_data
+def _name_index(mtime):
+    # Inverted index: lowercased name -> list positions, so Track
+    # History lookups are O(1) even though every keystroke reruns
+    index = defaultdict(list)
+    for i, g in enumerate(_load_cached(GRIEVANCE_FILE, mtime)):
+        index[g["Name"].lower()].append(i)
+    return dict(index)
+
+@st.cache_data
+def grievances_df(mtime):
+    # Materialize the list-of-dicts into a DataFrame once per store
+    # version instead of on every rerun of every tab.
+    return pd.DataFrame(_load_cached(GRIEVANCE_FILE, mtime))
+
+def _append_record(record):
+    with open(GRIEVANCE_FILE, "ab") as f:
+        f.write(orjson.dumps(record) + b"\n")
+    _load_cached.clear()
+
+def append_grievance(grievance):
+    _append_record(grievance)
+
+def append_status_update(grievance):
+    _append_record({
+        "op": "update",
+        "ID": grievance["ID"],
+        "Status": grievance["Status"],
+        "Escalated": grievance["Escalated"]
+    })
 
-def save_grievances(grievances):
-    with open("grievances.json", "w") as f:
-        json.dump(grievances, f, indent=4)
+def compact_grievances(grievances):
+    with open(GRIEVANCE_FILE, "wb") as f:
+        for g in grievances:
+            f.write(orjson.dumps(g) + b"\n")
+    _load_cached.clear()
 
 # Logic Functions for Categorization and Priority
-def extract_keywords(text):
-    return [word for word in text.lower().split() if len(word) > 4]
-
-def categorize_grievance(text):
-    categories = {
-        "Water Supply": ["water", "supply", "tap"],
-        "Garbage": ["garbage", "trash", "waste"],
-        "Electricity": ["electric", "light", "power"],
-        "Road Damage": ["road", "pothole", "crack"]
-    }
-    for category, keywords in categories.items():
-        if any(keyword in text.lower() for keyword in keywords):
-            return category
-    return "Other"
-
-def grievance_score(text):
+#
+# All static tables are module-level constants (tuples where ordering
+# matters but mutation never does): Streamlit caches module state
+# across reruns, so these are built exactly once per process.
+CATEGORIES = {
+    "Water Supply": ("water", "supply", "tap"),
+    "Garbage": ("garbage", "trash", "waste"),
+    "Electricity": ("electric", "light", "power"),
+    "Road Damage": ("road", "pothole", "crack")
+}
+
+# High Urgency Keywords (Critical Issues)
+URGENT_KEYWORDS = ("urgent", "danger", "injury", "critical", "emergency", "life-threatening", "fire", "flood", "accident", "immediate", "disaster")
+
+# Medium Urgency Keywords (Important Issues)
+MEDIUM_KEYWORDS = ("important", "delayed", "issue", "complaint", "damaged", "repair", "malfunction", "urgent", "critical", "problem")
+
+# Low Urgency Keywords (Non-Emergency Issues)
+LOW_KEYWORDS = ("routine", "normal", "minor", "checkup", "maintenance", "scheduled", "repair", "recheck", "regular", "ongoing")
+
+# Phrases that indicate an unresolved grievance (scored once as a group)
+PENALTY_KEYWORDS = ("not resolved", "again")
+
+# Merge the urgency buckets into one weight per unique keyword. A
+# keyword listed in several buckets used to score once per bucket
+# ("urgent" cost 40+20), which both double-counted it and scanned the
+# text for the same string twice; it now counts once at its strongest
+# urgency.
+KEYWORD_WEIGHTS = {}
+for keywords, weight in [
+    (URGENT_KEYWORDS, 40),
+    (MEDIUM_KEYWORDS, 20),
+    (LOW_KEYWORDS, 5),
+]:
+    for kw in keywords:
+        KEYWORD_WEIGHTS[kw] = max(KEYWORD_WEIGHTS.get(kw, 0), weight)
+
+# Build a single merged Aho-Corasick automaton at import time: every
+# known keyword appears once, tagged with everything it contributes to
+# (score weight and/or category hit), so the whole submission analysis
+# is one pass over the text. Score entries dedup on their key; the
+# penalty phrases share one key so the group scores only once.
+SCORE_KEY_IDS = {}  # dedup key -> dense column id, for batch re-scoring
+_score_weights = []
+for kw, weight in KEYWORD_WEIGHTS.items():
+    SCORE_KEY_IDS[kw] = len(_score_weights)
+    _score_weights.append(weight)
+SCORE_KEY_IDS["penalty"] = len(_score_weights)
+_score_weights.append(25)
+SCORE_WEIGHTS = np.array(_score_weights, dtype=np.int64)
+
+_entries = {}
+for kw, weight in KEYWORD_WEIGHTS.items():
+    _entries.setdefault(kw, []).append(("score", kw, weight))
+for kw in PENALTY_KEYWORDS:
+    _entries.setdefault(kw, []).append(("score", "penalty", 25))
+for category, keywords in CATEGORIES.items():
+    for kw in keywords:
+        _entries.setdefault(kw, []).append(("cat", category, 0))
+
+analyzer = ahocorasick.Automaton()
+for kw, entries in _entries.items():
+    analyzer.add_word(kw, (kw, tuple(entries)))
+analyzer.make_automaton()
+
+# Keyword order for the Hyperscan pattern database: pattern id i maps
+# to dense score column _HS_COLUMNS[i]
+_HS_KEYWORDS = list(KEYWORD_WEIGHTS) + list(PENALTY_KEYWORDS)
+_HS_COLUMNS = [SCORE_KEY_IDS[kw if kw in SCORE_KEY_IDS else "penalty"] for kw in _HS_KEYWORDS]
+
+@st.cache_resource
+def _hyperscan_db():
+    # Compile the keyword set once per process; compilation is too
+    # expensive for the per-submission path but amortizes over a batch.
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[kw.encode() for kw in _HS_KEYWORDS],
+        ids=list(range(len(_HS_KEYWORDS))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_HS_KEYWORDS),
+    )
+    return db
+
+def _word_bounded(text, start, end):
+    # Reject matches embedded inside a longer word, e.g. "power" should
+    # not match "empower" or "tap" match "tape"
+    if start > 0 and text[start - 1].isalnum():
+        return False
+    if end + 1 < len(text) and text[end + 1].isalnum():
+        return False
+    return True
+
+# Fixed vocabulary of known keywords. Each grievance stores a bitmask
+# of which vocabulary words appeared ("KWMask") instead of repeating
+# the strings per record, which keeps the store small and lets keyword
+# filters run as integer math on an int64 column.
+KEYWORD_ID = {kw: i for i, kw in enumerate(sorted(
+    set(KEYWORD_WEIGHTS) | {kw for kws in CATEGORIES.values() for kw in kws}))}
+
+def analyze(text):
+    # One lowercase, one automaton pass, one tokenization: returns the
+    # category, priority score, vocabulary bitmask and leftover keywords
+    # that used to cost three separate scans over the text.
+    text_lower = text.lower()
     score = 0
+    seen = set()
+    cat_hits = set()
+    mask = 0
+    for end, (kw, entries) in analyzer.iter(text_lower):
+        if not _word_bounded(text_lower, end - len(kw) + 1, end):
+            continue
+        kid = KEYWORD_ID.get(kw)
+        if kid is not None:
+            mask |= 1 << kid
+        for kind, key, weight in entries:
+            if kind == "cat":
+                cat_hits.add(key)
+            elif key not in seen:
+                seen.add(key)
+                score += weight
 
-    # High Urgency Keywords (Critical Issues)
-    urgent_keywords = ["urgent", "danger", "injury", "critical", "emergency", "life-threatening", "fire", "flood", "accident", "immediate", "disaster"]
-    
-    # Medium Urgency Keywords (Important Issues)
-    medium_keywords = ["important", "delayed", "issue", "complaint", "damaged", "repair", "malfunction", "urgent", "critical", "problem"]
-    
-    # Low Urgency Keywords (Non-Emergency Issues)
-    low_keywords = ["routine", "normal", "minor", "checkup", "maintenance", "scheduled", "repair", "recheck", "regular", "ongoing"]
-    
-    # High Urgency Scoring
-    for word in urgent_keywords:
-        if word in text.lower():
-            score += 40  # Higher points for critical keywords
-    
-    # Medium Urgency Scoring
-    for word in medium_keywords:
-        if word in text.lower():
-            score += 20  # Moderate points for medium urgency keywords
-    
-    # Low Urgency Scoring
-    for word in low_keywords:
-        if word in text.lower():
-            score += 5  # Low points for non-urgent keywords
-
-    # Penalize unresolved grievances
-    if "not resolved" in text.lower() or "again" in text.lower():
-        score += 25
+    # Preserve the original priority order of the category table
+    category = "Other"
+    for cat in CATEGORIES:
+        if cat in cat_hits:
+            category = cat
+            break
 
+    extras = [word for word in text_lower.split() if len(word) > 4 and word not in KEYWORD_ID]
     # Ensure that the score doesn't exceed 100 (highest priority)
-    return min(score + 50, 100)  # Add base score to the final score
+    return category, min(score + 50, 100), mask, extras
+
+@njit(parallel=True, cache=True)
+def _score_batch(hits, weights):
+    out = np.empty(hits.shape[0], dtype=np.int64)
+    for i in prange(hits.shape[0]):
+        s = 50
+        for j in range(hits.shape[1]):
+            s += hits[i, j] * weights[j]
+        out[i] = min(s, 100)
+    return out
+
+def _keyword_hits(grievances):
+    # Dense (grievance, score key) hit matrix. Hyperscan's JIT'd DFA
+    # scans at memory bandwidth when available; otherwise fall back to
+    # one pass of the merged automaton per text.
+    hits = np.zeros((len(grievances), len(SCORE_WEIGHTS)), dtype=np.uint8)
+    if hyperscan is not None:
+        db = _hyperscan_db()
+        for i, g in enumerate(grievances):
+            data = g["Text"].lower().encode()
+
+            def on_match(pid, start, end, flags, context, row=i, data=data):
+                # Match offsets are byte positions in the scanned buffer
+                if (start == 0 or not data[start - 1:start].isalnum()) and \
+                        (end == len(data) or not data[end:end + 1].isalnum()):
+                    hits[row, _HS_COLUMNS[pid]] = 1
+
+            db.scan(data, match_event_handler=on_match)
+    else:
+        for i, g in enumerate(grievances):
+            text_lower = g["Text"].lower()
+            for end, (kw, entries) in analyzer.iter(text_lower):
+                if not _word_bounded(text_lower, end - len(kw) + 1, end):
+                    continue
+                for kind, key, _weight in entries:
+                    if kind == "score":
+                        hits[i, SCORE_KEY_IDS[key]] = 1
+    return hits
+
+def rescore_all(grievances):
+    # Batch re-scoring for stored grievances (e.g. after keyword weights
+    # change): one multi-pattern pass per text builds a dense hit
+    # matrix, then a parallel jitted loop recomputes every priority.
+    if len(grievances):
+        hits = _keyword_hits(grievances)
+        for g, s in zip(grievances, _score_batch(hits, SCORE_WEIGHTS)):
+            g["Priority"] = int(s)
+    return grievances
+
+MENU = ("Submit Grievance", "Admin Panel", "Track History", "Feedback & Reopen")
+
+# Next-level action per (category, is high priority), built once so
+# suggest_action is a single dict lookup instead of rebuilding a dict
+# with four conditional expressions on every call
+ACTIONS = {
+    ("Water Supply", True): "Forward to Jal Nigam for urgent inspection",
+    ("Water Supply", False): "Forward to Jal Nigam for regular check",
+    ("Road Damage", True): "Notify PWD for immediate repair",
+    ("Road Damage", False): "Notify PWD for standard check",
+    ("Garbage", True): "Alert sanitation department for immediate cleaning",
+    ("Garbage", False): "Alert sanitation department for routine collection",
+    ("Electricity", True): "Notify electricity board for urgent check",
+    ("Electricity", False): "Notify electricity board for regular maintenance"
+}
 
 def suggest_action(category, priority):
     # Assign next level action based on priority
-    actions = {
-        "Water Supply": "Forward to Jal Nigam for urgent inspection" if priority > 70 else "Forward to Jal Nigam for regular check",
-        "Road Damage": "Notify PWD for immediate repair" if priority > 70 else "Notify PWD for standard check",
-        "Garbage": "Alert sanitation department for immediate cleaning" if priority > 70 else "Alert sanitation department for routine collection",
-        "Electricity": "Notify electricity board for urgent check" if priority > 70 else "Notify electricity board for regular maintenance"
-    }
-    return actions.get(category, "Review and assign appropriate department.")
+    return ACTIONS.get((category, priority > 70), "Review and assign appropriate department.")
 
 def auto_escalate(grievance):
     # Automatically escalate if unresolved and more than 3 days old
@@ -86,16 +329,54 @@ def auto_escalate(grievance):
         return True
     return False
 
+def escalate_stale(grievances):
+    # Bulk sweep over the whole store: parse every Date in one
+    # pd.to_datetime call and compare ages as a single numpy operation
+    # instead of running strptime per grievance.
+    if not grievances:
+        return 0
+    df = pd.DataFrame(grievances)
+    ages = (np.datetime64(datetime.date.today()) - pd.to_datetime(df['Date'].values))
+    stale = (ages.days > 3) & (df['Status'].values == "Pending")
+    for i in np.flatnonzero(stale):
+        g = grievances[i]
+        g['Escalated'] = "Yes"
+        g['Status'] = "Escalated"
+        append_status_update(g)
+    return int(stale.sum())
+
 # App Setup
 st.set_page_config("Jan Darpan - Grievance Tracker", layout="wide")
 st.title("Jan Darpan - AI-Powered Grievance Tracker")
 
-menu = ["Submit Grievance", "Admin Panel", "Track History", "Feedback & Reopen"]
-choice = st.sidebar.radio("Navigate", menu)
+choice = st.sidebar.radio("Navigate", MENU)
 
-grievances = load_grievances()
+grievances = _load_cached(GRIEVANCE_FILE, _store_mtime())
 upload_dir = "uploads"
-os.makedirs(upload_dir, exist_ok=True)
+# Only touch the filesystem when the directory is actually missing,
+# not once per rerun
+if not os.path.isdir(upload_dir):
+    os.makedirs(upload_dir)
+
+def save_upload(uploaded, ext):
+    # Content-addressed storage: hash the upload while streaming it to
+    # a temp file, then rename to uploads/<hash>.<ext>. Re-submissions
+    # of the same bytes dedupe to one file on disk.
+    hasher = hashlib.blake2b(digest_size=16)
+    tmp_path = os.path.join(upload_dir, f"tmp_{uuid.uuid4().hex}")
+    with open(tmp_path, "wb") as f:
+        while True:
+            chunk = uploaded.read(1 << 20)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            f.write(chunk)
+    path = os.path.join(upload_dir, f"{hasher.hexdigest()}.{ext}")
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.rename(tmp_path, path)
+    return path
 
 # Submit Grievance
 if choice == "Submit Grievance":
@@ -116,75 +397,93 @@ if choice == "Submit Grievance":
     if submitted:
         if name and grievance_text:
             grievance_id = str(uuid.uuid4())[:8]
-            category = categorize_grievance(grievance_text)
-            priority = grievance_score(grievance_text)
-            keywords = extract_keywords(grievance_text)
+            category, priority, kw_mask, keywords = analyze(grievance_text)
             image_path = None
             doc_path = None
-            timestamp = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
 
             if uploaded_image:
-                image_path = os.path.join(upload_dir, f"{name}_{timestamp}_image.png")
-                with open(image_path, "wb") as f:
-                    f.write(uploaded_image.read())
+                image_path = save_upload(uploaded_image, "png")
 
             if uploaded_doc:
-                ext = uploaded_doc.name.split('.')[-1]
-                doc_path = os.path.join(upload_dir, f"{name}_{timestamp}_doc.{ext}")
-                with open(doc_path, "wb") as f:
-                    f.write(uploaded_doc.read())
+                doc_path = save_upload(uploaded_doc, uploaded_doc.name.split('.')[-1])
 
-            grievances.append({
+            new_grievance = {
                 "ID": grievance_id,
                 "Name": name,
                 "Text": grievance_text,
                 "Category": category,
                 "Date": str(grievance_date),
                 "Priority": priority,
+                "KWMask": kw_mask,
                 "Keywords": keywords,
                 "Status": "Pending",
                 "Escalated": "No",
                 "Image": image_path,
                 "Attachment": doc_path
-            })
-            save_grievances(grievances)
+            }
+            grievances.append(new_grievance)
+            append_grievance(new_grievance)
             st.success(f"✅ Grievance Submitted! Your Reference ID: {grievance_id}")
         else:
             st.warning("Please fill in all fields.")
 
 # Admin Panel
-elif choice == "Admin Panel":
+@st.fragment
+def admin_dashboard():
+    # Fragment: filter/button interactions rerun only this block, not
+    # the whole script. The DataFrame is fetched here rather than
+    # passed in so reruns after a mutation see the new store (the
+    # fetch is an st.cache_data hit whenever the store is unchanged).
+    df = grievances_df(_store_mtime())
+    # One hash-based groupby pass instead of an O(N) mask scan per row
+    max_priority = df.groupby('Category')['Priority'].transform('max')
+    df['Suggested Action'] = [suggest_action(c, p) for c, p in zip(df['Category'], max_priority)]
+
+    # Filters
+    status_filter = st.selectbox("Filter by Status", ["All", "Pending", "Resolved", "Escalated"])
+    if status_filter != "All":
+        df = df[df["Status"] == status_filter]
+
+    cat_filter = st.multiselect("Filter by Category", df["Category"].unique())
+    if cat_filter:
+        df = df[df["Category"].isin(cat_filter)]
+
+    kw_filter = st.selectbox("Filter by Keyword", ["All"] + sorted(KEYWORD_ID))
+    if kw_filter != "All" and "KWMask" in df.columns:
+        # Vectorized bit test; records from before KWMask have no bits set
+        masks = df["KWMask"].fillna(0).astype("int64")
+        df = df[(masks & (1 << KEYWORD_ID[kw_filter])) != 0]
+
+    st.dataframe(df.sort_values(by="Priority", ascending=False), use_container_width=True)
+
+    # Update Status
+    st.markdown("---")
+    st.subheader("📝 Update Grievance Status")
+    id_index = _id_index(_store_mtime())
+    selected_id = st.selectbox("Select Grievance ID", list(id_index))
+    new_status = st.selectbox("Update Status To", ["Pending", "Resolved", "Escalated"])
+
+    if st.button("✅ Update Status"):
+        g = grievances[id_index[selected_id]]
+        g["Status"] = new_status
+        auto_escalate(g)  # Auto escalate unresolved grievances
+        append_status_update(g)
+        st.success(f"Status updated to {new_status} for ID {selected_id}")
+
+    if st.button("⏫ Escalate Stale Grievances"):
+        escalated = escalate_stale(grievances)
+        st.success(f"Escalated {escalated} stale pending grievance(s).")
+
+    if st.button("🔁 Re-score All Priorities"):
+        rescore_all(grievances)
+        compact_grievances(grievances)
+        st.success("Priorities recomputed for all grievances.")
+
+if choice == "Admin Panel":
     st.subheader("Admin Dashboard")
 
     if grievances:
-        df = pd.DataFrame(grievances)
-        df['Suggested Action'] = df['Category'].apply(lambda x: suggest_action(x, df.loc[df['Category'] == x, 'Priority'].max()))
-
-        # Filters
-        status_filter = st.selectbox("Filter by Status", ["All", "Pending", "Resolved", "Escalated"])
-        if status_filter != "All":
-            df = df[df["Status"] == status_filter]
-
-        cat_filter = st.multiselect("Filter by Category", df["Category"].unique())
-        if cat_filter:
-            df = df[df["Category"].isin(cat_filter)]
-
-        st.dataframe(df.sort_values(by="Priority", ascending=False), use_container_width=True)
-
-        # Update Status
-        st.markdown("---")
-        st.subheader("📝 Update Grievance Status")
-        selected_id = st.selectbox("Select Grievance ID", [g['ID'] for g in grievances])
-        new_status = st.selectbox("Update Status To", ["Pending", "Resolved", "Escalated"])
-
-        if st.button("✅ Update Status"):
-            for g in grievances:
-                if g["ID"] == selected_id:
-                    g["Status"] = new_status
-                    auto_escalate(g)  # Auto escalate unresolved grievances
-            save_grievances(grievances)
-            st.success(f"Status updated to {new_status} for ID {selected_id}")
-
+        admin_dashboard()
     else:
         st.info("No grievances available yet.")
 
@@ -193,9 +492,9 @@ elif choice == "Track History":
     st.subheader("Track Your Grievance")
     name = st.text_input("Enter your name to search")
     if name:
-        records = [g for g in grievances if g["Name"].lower() == name.lower()]
-        if records:
-            st.write(pd.DataFrame(records))
+        positions = _name_index(_store_mtime()).get(name.lower(), [])
+        if positions:
+            st.write(pd.DataFrame([grievances[i] for i in positions]))
         else:
             st.warning("No records found.")
 